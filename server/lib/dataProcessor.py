@@ -1,47 +1,101 @@
 import pandas as pd
 import torch
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import Dataset, DataLoader, Sampler
 from transformers import AutoTokenizer
 from pathlib import Path
 import logging
+import os
+import random
 import numpy as np
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Optional
+
+# Use the multithreaded pyarrow CSV parser when it is installed
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:
+    pa = None
+
+def seed_worker(worker_id: int):
+    """Seed numpy and random in each DataLoader worker from the torch seed"""
+    worker_seed = torch.initial_seed() % 2**32
+    np.random.seed(worker_seed)
+    random.seed(worker_seed)
 
 class NewsDataset(Dataset):
-    """Dataset class for news articles"""
-    def __init__(self, texts: List[str], labels: List[int], tokenizer: AutoTokenizer, max_length: int = 512):
-        self.texts = texts
+    """Dataset class for pre-tokenized news articles"""
+    def __init__(self, input_ids: np.ndarray, attention_mask: np.ndarray, labels: torch.Tensor):
+        self.input_ids = input_ids
+        self.attention_mask = attention_mask
         self.labels = labels
-        self.tokenizer = tokenizer
-        self.max_length = max_length
+        
+        # Number of real (non-padding) tokens per sample
+        self.lengths = attention_mask.sum(axis=1)
         
     def __len__(self) -> int:
-        return len(self.texts)
+        return len(self.labels)
     
     def __getitem__(self, idx: int) -> Dict[str, torch.Tensor]:
-        text = self.texts[idx]
-        label = self.labels[idx]
-        
-        # Tokenize
-        encoding = self.tokenizer(
-            text,
-            add_special_tokens=True,
-            max_length=self.max_length,
-            padding='max_length',
-            truncation=True,
-            return_tensors='pt'
-        )
-        
+        # Tokenization is done once upfront, so this is just slicing
         return {
-            'input_ids': encoding['input_ids'].squeeze(),
-            'attention_mask': encoding['attention_mask'].squeeze(),
-            'labels': torch.tensor(label, dtype=torch.long)
+            'input_ids': torch.from_numpy(self.input_ids[idx]),
+            'attention_mask': torch.from_numpy(self.attention_mask[idx]),
+            'labels': self.labels[idx]
         }
 
+class LengthBucketBatchSampler(Sampler):
+    """Batch sampler that groups samples of similar length so batches need little padding"""
+    def __init__(self, lengths: np.ndarray, batch_size: int, shuffle: bool = False, drop_last: bool = False):
+        self.lengths = lengths
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        # A split smaller than one batch keeps its partial batch instead of yielding nothing
+        self.drop_last = drop_last and len(lengths) >= batch_size
+        
+    def __len__(self) -> int:
+        if self.drop_last:
+            return len(self.lengths) // self.batch_size
+        return (len(self.lengths) + self.batch_size - 1) // self.batch_size
+    
+    def __iter__(self):
+        if self.shuffle:
+            # Shuffle before sorting so equal-length samples are mixed differently every epoch
+            indices = torch.randperm(len(self.lengths)).numpy()
+        else:
+            indices = np.arange(len(self.lengths))
+        
+        if self.drop_last:
+            # Drop a random remainder rather than always the longest samples
+            indices = indices[:len(self) * self.batch_size]
+        
+        indices = indices[np.argsort(self.lengths[indices], kind='stable')]
+        batches = [indices[i:i + self.batch_size] for i in range(0, len(indices), self.batch_size)]
+        
+        # Shuffle at the batch level
+        if self.shuffle:
+            batches = [batches[i] for i in torch.randperm(len(batches)).tolist()]
+        
+        for batch in batches:
+            yield batch.tolist()
+
+def collate_dynamic_padding(batch: List[Dict[str, torch.Tensor]]) -> Dict[str, torch.Tensor]:
+    """Collate a batch, trimming padding to the longest sample in the batch instead of max_length"""
+    max_len = max(int(item['attention_mask'].sum()) for item in batch)
+    
+    return {
+        'input_ids': torch.stack([item['input_ids'][:max_len] for item in batch]),
+        'attention_mask': torch.stack([item['attention_mask'][:max_len] for item in batch]),
+        'labels': torch.stack([item['labels'] for item in batch])
+    }
+
 class DataProcessor:
     """Class to load and process datasets"""
-    def __init__(self, model_name: str):
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+    def __init__(self, model_name: str, max_length: int = 512):
+        # collate_dynamic_padding trims padding from the end, so padding must be on the right
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True, padding_side='right')
+        assert self.tokenizer.is_fast, f"No fast tokenizer available for {model_name}"
+        assert self.tokenizer.padding_side == 'right', f"Tokenizer for {model_name} does not pad on the right"
+        self.max_length = max_length
         self.logger = logging.getLogger(__name__)
         
         # Define dataset paths
@@ -49,17 +103,84 @@ class DataProcessor:
         self.liar_dir = self.dataset_dir / 'LIAR'
         self.fakenews_dir = self.dataset_dir / 'Fakenews'
         
-    def load_liar_dataset(self) -> Dict[str, Tuple[List[str], List[int]]]:
+        # Raw splits and pre-tokenized datasets, cached so each dataset is loaded and tokenized once
+        self._raw_data: Dict[str, Dict[str, Tuple[Any, np.ndarray]]] = {}
+        self._datasets: Dict[Tuple[str, str], NewsDataset] = {}
+        
+    def _pretokenize(self, texts: Any, labels: np.ndarray) -> NewsDataset:
+        """Tokenize a whole split in one batched call to the fast tokenizer"""
+        # Arrow arrays are converted to Python strings only here, right before tokenizing
+        texts = texts.to_pylist() if hasattr(texts, 'to_pylist') else list(texts)
+        encoding = self.tokenizer(
+            texts,
+            add_special_tokens=True,
+            max_length=self.max_length,
+            padding='max_length',
+            truncation=True,
+            return_tensors='np'
+        )
+        
+        return NewsDataset(
+            encoding['input_ids'].astype(np.int32),
+            encoding['attention_mask'].astype(np.int32),
+            torch.as_tensor(labels, dtype=torch.long)
+        )
+    
+    def _read_texts(self, path: Path) -> Any:
+        """Read the text column of a news content CSV (an Arrow array if pyarrow is installed)"""
+        if pa is not None:
+            table = pa_csv.read_csv(
+                path,
+                read_options=pa_csv.ReadOptions(use_threads=True),
+                parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+                convert_options=pa_csv.ConvertOptions(include_columns=['text'])
+            )
+            return table.column('text')
+        
+        return pd.read_csv(path, usecols=['text'], dtype={'text': 'string'})['text'].to_numpy(dtype=object)
+    
+    def _shuffle_and_split(self, real_texts: Any, fake_texts: Any) -> Dict[str, Tuple[Any, np.ndarray]]:
+        """Combine real/fake articles, shuffle and split into train and validation (80/20)"""
+        if pa is not None:
+            texts = pa.chunked_array(real_texts.chunks + fake_texts.chunks)
+        else:
+            texts = np.concatenate([real_texts, fake_texts])
+        labels = np.concatenate([
+            np.ones(len(real_texts), dtype=np.int64),   # 1 for real
+            np.zeros(len(fake_texts), dtype=np.int64)   # 0 for fake
+        ])
+        
+        # Shuffle
+        indices = np.random.RandomState(0).permutation(len(labels))
+        texts = texts.take(indices)
+        labels = labels[indices]
+        
+        split_idx = int(0.8 * len(labels))
+        
+        return {
+            'train': (texts[:split_idx], labels[:split_idx]),
+            'valid': (texts[split_idx:], labels[split_idx:])
+        }
+    
+    def load_liar_dataset(self) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
         """Load the LIAR dataset"""
         self.logger.info("Loading LIAR dataset...")
         
-        # Load train, validation, and test sets
-        train_df = pd.read_csv(self.liar_dir / 'train.tsv', sep='\t', header=None)
-        valid_df = pd.read_csv(self.liar_dir / 'valid.tsv', sep='\t', header=None)
-        test_df = pd.read_csv(self.liar_dir / 'test.tsv', sep='\t', header=None)
-        
         # LIAR dataset columns: [id, label, statement, subject, speaker, job_title, state_info, party_affiliation, context]
-        # We only need the statement (text) and label
+        # We only need the statement (text) and label. The C engine keeps the original
+        # column labels with header=None + usecols; pandas' pyarrow engine renumbers them
+        read_kwargs = {
+            'sep': '\t',
+            'header': None,
+            'usecols': [1, 2],
+            'dtype': {1: 'category', 2: 'string'},
+            'engine': 'c'
+        }
+        
+        # Load train, validation, and test sets
+        train_df = pd.read_csv(self.liar_dir / 'train.tsv', **read_kwargs)
+        valid_df = pd.read_csv(self.liar_dir / 'valid.tsv', **read_kwargs)
+        test_df = pd.read_csv(self.liar_dir / 'test.tsv', **read_kwargs)
         
         # Convert labels to numeric values
         label_map = {
@@ -71,14 +192,14 @@ class DataProcessor:
             'true': 5
         }
         
-        train_texts = train_df[2].tolist()
-        train_labels = [label_map[label] for label in train_df[1].tolist()]
+        train_texts = train_df[2].to_numpy(dtype=object)
+        train_labels = train_df[1].map(label_map).to_numpy(dtype=np.int64)
         
-        valid_texts = valid_df[2].tolist()
-        valid_labels = [label_map[label] for label in valid_df[1].tolist()]
+        valid_texts = valid_df[2].to_numpy(dtype=object)
+        valid_labels = valid_df[1].map(label_map).to_numpy(dtype=np.int64)
         
-        test_texts = test_df[2].tolist()
-        test_labels = [label_map[label] for label in test_df[1].tolist()]
+        test_texts = test_df[2].to_numpy(dtype=object)
+        test_labels = test_df[1].map(label_map).to_numpy(dtype=np.int64)
         
         return {
             'train': (train_texts, train_labels),
@@ -86,118 +207,83 @@ class DataProcessor:
             'test': (test_texts, test_labels)
         }
     
-    def load_politifact_dataset(self) -> Dict[str, Tuple[List[str], List[int]]]:
+    def load_politifact_dataset(self) -> Dict[str, Tuple[Any, np.ndarray]]:
         """Load the PolitiFact dataset"""
         self.logger.info("Loading PolitiFact dataset...")
         
         # Load real and fake news content
-        real_df = pd.read_csv(self.fakenews_dir / 'PolitiFact_real_news_content.csv')
-        fake_df = pd.read_csv(self.fakenews_dir / 'PolitiFact_fake_news_content.csv')
-        
-        # Combine and shuffle
-        real_texts = real_df['text'].tolist()
-        real_labels = [1] * len(real_texts)  # 1 for real
-        
-        fake_texts = fake_df['text'].tolist()
-        fake_labels = [0] * len(fake_texts)  # 0 for fake
-        
-        all_texts = real_texts + fake_texts
-        all_labels = real_labels + fake_labels
-        
-        # Shuffle
-        indices = np.random.permutation(len(all_texts))
-        shuffled_texts = [all_texts[i] for i in indices]
-        shuffled_labels = [all_labels[i] for i in indices]
-        
-        # Split into train and validation (80/20)
-        split_idx = int(0.8 * len(shuffled_texts))
-        
-        train_texts = shuffled_texts[:split_idx]
-        train_labels = shuffled_labels[:split_idx]
+        real_texts = self._read_texts(self.fakenews_dir / 'PolitiFact_real_news_content.csv')
+        fake_texts = self._read_texts(self.fakenews_dir / 'PolitiFact_fake_news_content.csv')
         
-        valid_texts = shuffled_texts[split_idx:]
-        valid_labels = shuffled_labels[split_idx:]
-        
-        return {
-            'train': (train_texts, train_labels),
-            'valid': (valid_texts, valid_labels)
-        }
+        return self._shuffle_and_split(real_texts, fake_texts)
     
-    def load_buzzfeed_dataset(self) -> Dict[str, Tuple[List[str], List[int]]]:
+    def load_buzzfeed_dataset(self) -> Dict[str, Tuple[Any, np.ndarray]]:
         """Load the BuzzFeed dataset"""
         self.logger.info("Loading BuzzFeed dataset...")
         
         # Load real and fake news content
-        real_df = pd.read_csv(self.fakenews_dir / 'BuzzFeed_real_news_content.csv')
-        fake_df = pd.read_csv(self.fakenews_dir / 'BuzzFeed_fake_news_content.csv')
-        
-        # Combine and shuffle
-        real_texts = real_df['text'].tolist()
-        real_labels = [1] * len(real_texts)  # 1 for real
-        
-        fake_texts = fake_df['text'].tolist()
-        fake_labels = [0] * len(fake_texts)  # 0 for fake
-        
-        all_texts = real_texts + fake_texts
-        all_labels = real_labels + fake_labels
-        
-        # Shuffle
-        indices = np.random.permutation(len(all_texts))
-        shuffled_texts = [all_texts[i] for i in indices]
-        shuffled_labels = [all_labels[i] for i in indices]
+        real_texts = self._read_texts(self.fakenews_dir / 'BuzzFeed_real_news_content.csv')
+        fake_texts = self._read_texts(self.fakenews_dir / 'BuzzFeed_fake_news_content.csv')
         
-        # Split into train and validation (80/20)
-        split_idx = int(0.8 * len(shuffled_texts))
-        
-        train_texts = shuffled_texts[:split_idx]
-        train_labels = shuffled_labels[:split_idx]
-        
-        valid_texts = shuffled_texts[split_idx:]
-        valid_labels = shuffled_labels[split_idx:]
-        
-        return {
-            'train': (train_texts, train_labels),
-            'valid': (valid_texts, valid_labels)
+        return self._shuffle_and_split(real_texts, fake_texts)
+    
+    def get_dataset(self, dataset_name: str, split: str) -> NewsDataset:
+        """Get a pre-tokenized split of a dataset, loading and tokenizing it only once"""
+        key = (dataset_name, split)
+        if key not in self._datasets:
+            if dataset_name not in self._raw_data:
+                loaders = {
+                    'liar': self.load_liar_dataset,
+                    'politifact': self.load_politifact_dataset,
+                    'buzzfeed': self.load_buzzfeed_dataset
+                }
+                self._raw_data[dataset_name] = loaders[dataset_name]()
+            
+            texts, labels = self._raw_data[dataset_name][split]
+            self._datasets[key] = self._pretokenize(texts, labels)
+        
+        return self._datasets[key]
+    
+    def get_loader(self, dataset_name: str, split: str, batch_size: int, shuffle: bool = False,
+                   num_workers: Optional[int] = None) -> DataLoader:
+        """Get a data loader for one split of a dataset"""
+        if num_workers is None:
+            num_workers = min(8, os.cpu_count() or 1)
+        
+        dataset = self.get_dataset(dataset_name, split)
+        
+        # Bucket samples by length and pad each batch only to its longest sample;
+        # training drops the last partial batch if there is at least one full batch
+        batch_sampler = LengthBucketBatchSampler(dataset.lengths, batch_size, shuffle=shuffle, drop_last=shuffle)
+        
+        # Pinned host memory lets batches be copied to the GPU asynchronously
+        loader_kwargs = {
+            'batch_sampler': batch_sampler,
+            'collate_fn': collate_dynamic_padding,
+            'num_workers': num_workers,
+            'pin_memory': torch.cuda.is_available(),
+            'worker_init_fn': seed_worker
         }
+        if num_workers > 0:
+            # Keep workers alive across epochs instead of re-spawning them
+            loader_kwargs['persistent_workers'] = True
+            loader_kwargs['prefetch_factor'] = 2
+        
+        return DataLoader(dataset, **loader_kwargs)
     
-    def get_data_loaders(self, batch_size: int) -> Dict[str, DataLoader]:
+    def get_data_loaders(self, batch_size: int, num_workers: Optional[int] = None) -> Dict[str, DataLoader]:
         """Get data loaders for all datasets"""
-        data_loaders = {}
-        
-        # Load LIAR dataset
-        liar_data = self.load_liar_dataset()
-        liar_train_texts, liar_train_labels = liar_data['train']
-        liar_valid_texts, liar_valid_labels = liar_data['valid']
-        liar_test_texts, liar_test_labels = liar_data['test']
-        
-        liar_train_dataset = NewsDataset(liar_train_texts, liar_train_labels, self.tokenizer)
-        liar_valid_dataset = NewsDataset(liar_valid_texts, liar_valid_labels, self.tokenizer)
-        liar_test_dataset = NewsDataset(liar_test_texts, liar_test_labels, self.tokenizer)
-        
-        data_loaders['liar_train'] = DataLoader(liar_train_dataset, batch_size=batch_size, shuffle=True)
-        data_loaders['liar_valid'] = DataLoader(liar_valid_dataset, batch_size=batch_size)
-        data_loaders['liar_test'] = DataLoader(liar_test_dataset, batch_size=batch_size)
-        
-        # Load PolitiFact dataset
-        politifact_data = self.load_politifact_dataset()
-        politifact_train_texts, politifact_train_labels = politifact_data['train']
-        politifact_valid_texts, politifact_valid_labels = politifact_data['valid']
-        
-        politifact_train_dataset = NewsDataset(politifact_train_texts, politifact_train_labels, self.tokenizer)
-        politifact_valid_dataset = NewsDataset(politifact_valid_texts, politifact_valid_labels, self.tokenizer)
-        
-        data_loaders['politifact_train'] = DataLoader(politifact_train_dataset, batch_size=batch_size, shuffle=True)
-        data_loaders['politifact_valid'] = DataLoader(politifact_valid_dataset, batch_size=batch_size)
-        
-        # Load BuzzFeed dataset
-        buzzfeed_data = self.load_buzzfeed_dataset()
-        buzzfeed_train_texts, buzzfeed_train_labels = buzzfeed_data['train']
-        buzzfeed_valid_texts, buzzfeed_valid_labels = buzzfeed_data['valid']
-        
-        buzzfeed_train_dataset = NewsDataset(buzzfeed_train_texts, buzzfeed_train_labels, self.tokenizer)
-        buzzfeed_valid_dataset = NewsDataset(buzzfeed_valid_texts, buzzfeed_valid_labels, self.tokenizer)
+        splits = {
+            'liar': ['train', 'valid', 'test'],
+            'politifact': ['train', 'valid'],
+            'buzzfeed': ['train', 'valid']
+        }
         
-        data_loaders['buzzfeed_train'] = DataLoader(buzzfeed_train_dataset, batch_size=batch_size, shuffle=True)
-        data_loaders['buzzfeed_valid'] = DataLoader(buzzfeed_valid_dataset, batch_size=batch_size)
+        data_loaders = {}
+        for dataset_name, dataset_splits in splits.items():
+            for split in dataset_splits:
+                data_loaders[f'{dataset_name}_{split}'] = self.get_loader(
+                    dataset_name, split, batch_size, shuffle=(split == 'train'), num_workers=num_workers
+                )
         
-        return data_loaders 
\ No newline at end of file
+        return data_loaders
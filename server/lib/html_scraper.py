@@ -2,9 +2,47 @@
 HTML Scraper for extracting article text from URLs
 Fixed version from fakenews-main
 """
+import asyncio
+import atexit
+import csv
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+import httpx
 import newspaper
 from datetime import datetime
 
+# HTTP/2 needs the optional h2 package (httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+# Shared clients so connections (TCP + TLS) are pooled across requests
+_client_kwargs = {
+    'http2': HTTP2,
+    'limits': httpx.Limits(max_keepalive_connections=32),
+    'timeout': httpx.Timeout(10.0),
+    'follow_redirects': True,
+    'headers': {'User-Agent': newspaper.Config().browser_user_agent}
+}
+_client = httpx.Client(**_client_kwargs)
+
+# Async connections belong to the event loop that opened them, so there is one client per loop
+_async_clients = weakref.WeakKeyDictionary()
+
+# Feedback CSV is kept open with a large buffer and flushed periodically instead of per row
+CSV_PATH = 'new_data.csv'
+CSV_FLUSH_INTERVAL = 5.0  # seconds
+_csv_file = None
+_csv_writer = None
+_csv_lock = threading.Lock()
+_flush_timer = None
+
+# Feedback articles are downloaded off the caller's thread
+_executor = ThreadPoolExecutor(max_workers=4)
+
 def dateify(date):
     """Convert date string to MM-DD-YYYY format"""
     if not date:
@@ -17,37 +55,110 @@ def dateify(date):
     except:
         return str(date)
 
-def html_scraper(url):
+def parse_article(url, html):
+    """Parse already downloaded HTML with newspaper3k (no blocking download)"""
+    article = newspaper.Article(url=url, language='en')
+    article.set_html(html)
+    article.parse()
+    return article
+
+def _response_html(response):
     """
-    Scrape article text from URL using newspaper3k
+    HTML to parse: decoded text if the server declared a charset, otherwise the raw bytes
+    so newspaper3k detects the encoding from the page's <meta charset> (httpx would assume UTF-8)
+    """
+    if response.charset_encoding is None:
+        return response.content
+    return response.text
+
+def fetch_article(url):
+    """Download and parse an article using the shared HTTP client"""
+    response = _client.get(url)
+    response.raise_for_status()
+    return parse_article(url, _response_html(response))
+
+def get_async_client():
+    """Get the pooled async HTTP client of the running event loop, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = _async_clients[loop] = httpx.AsyncClient(**_client_kwargs)
+    return client
+
+async def aclose_async_client():
+    """Close the async HTTP client of the running event loop (call before the loop shuts down)"""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+async def fetch_article_async(url, client=None):
+    """Download and parse an article using the given or the loop's shared async HTTP client"""
+    response = await (client or get_async_client()).get(url)
+    response.raise_for_status()
+    # Parsing is CPU-bound, so it runs in a thread to keep other fetches on the event loop moving
+    return await asyncio.to_thread(parse_article, url, _response_html(response))
+
+async def html_scraper_async(url, client=None):
+    """
+    Scrape article text from URL without blocking the event loop on the download
+    Pass an httpx.AsyncClient to use it instead of the loop's shared client
     Returns the article text, or the original input if it's not a valid URL
     """
     if len(url.split(" ")) != 1:
         return url  # Not a URL, return as-is
 
     try:
-        article = newspaper.Article(url=url, language='en')
-        article.download()
-        article.parse()
-        
+        article = await fetch_article_async(url, client)
         return str(article.text) if article.text else url
     except Exception as e:
         # If scraping fails, return the URL as-is
         print(f"Error scraping URL {url}: {e}")
         return url
 
-def add_to_CSV(url, classification):
+def html_scraper(url):
     """
-    Add article to CSV file (for feedback collection)
-    Fixed version with proper function call
+    Scrape article text from URL using newspaper3k
+    Returns the article text, or the original input if it's not a valid URL
     """
     if len(url.split(" ")) != 1:
-        return  # Not a URL
+        return url  # Not a URL, return as-is
+
+    try:
+        article = fetch_article(url)
+        return str(article.text) if article.text else url
+    except Exception as e:
+        # If scraping fails, return the URL as-is
+        print(f"Error scraping URL {url}: {e}")
+        return url
+
+def flush_CSV():
+    """Flush buffered feedback rows to disk"""
+    global _flush_timer
+    with _csv_lock:
+        _flush_timer = None
+        if _csv_file is not None:
+            _csv_file.flush()
 
+def _write_CSV_row(row):
+    """Append a row to the feedback CSV, scheduling a flush instead of flushing every row"""
+    global _csv_file, _csv_writer, _flush_timer
+    with _csv_lock:
+        if _csv_writer is None:
+            _csv_file = open(CSV_PATH, 'a', newline='', buffering=1 << 16)
+            _csv_writer = csv.writer(_csv_file)
+            atexit.register(flush_CSV)
+        
+        _csv_writer.writerow(row)
+        
+        if _flush_timer is None:
+            _flush_timer = threading.Timer(CSV_FLUSH_INTERVAL, flush_CSV)
+            _flush_timer.daemon = True
+            _flush_timer.start()
+
+def _add_to_CSV(url, classification):
+    """Download the article and append it to the feedback CSV"""
     try:
-        article = newspaper.Article(url=url, language='en')
-        article.download()
-        article.parse()
+        article = fetch_article(url)
         
         article_data = {
             "title": str(article.title) if article.title else "",
@@ -64,10 +175,16 @@ def add_to_CSV(url, classification):
         formatted_date = dateify(article_data['published_date'])
         new_row = [article_data['title'], article_data['text'], classification, formatted_date]
 
-        import csv
-        with open('new_data.csv', 'a', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(new_row)
+        _write_CSV_row(new_row)
     except Exception as e:
         print(f"Error adding to CSV: {e}")
 
+def add_to_CSV(url, classification):
+    """
+    Add article to CSV file (for feedback collection)
+    The download runs in a background thread; returns a Future, or None if it's not a valid URL
+    """
+    if len(url.split(" ")) != 1:
+        return  # Not a URL
+
+    return _executor.submit(_add_to_CSV, url, classification)
@@ -5,12 +5,18 @@ from torch.optim import AdamW
 from torch.utils.data import DataLoader
 from sklearn.metrics import accuracy_score, precision_recall_fscore_support
 import logging
+import math
+import threading
 from pathlib import Path
 import json
 from typing import Dict, List, Tuple, Any
 from .dataProcessor import DataProcessor
 from .weightInitializer import init_empty_weights
 
+# Trainers are expensive to build (weights, tokenizer), so they are shared per model configuration
+_MODEL_CACHE: Dict[Tuple[str, int], 'ModelTrainer'] = {}
+_MODEL_CACHE_LOCK = threading.Lock()
+
 class ModelTrainer:
     """Class to handle model training and evaluation"""
     def __init__(self, model_name: str = "bert-base-uncased", num_labels: int = 6):
@@ -20,67 +26,146 @@ class ModelTrainer:
         # Initialize tokenizer first
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
         
+        # Initialize model
+        self.model_name = model_name
+        self.num_labels = num_labels
+        self.build_model()
+        
+        # Initialize data processor
+        self.data_processor = DataProcessor(model_name)
+        
+        # Persistent device buffers for single-text prediction (inputs are always padded to max_length)
+        input_shape = (1, self.data_processor.max_length)
+        self._input_ids_buffer = torch.zeros(input_shape, dtype=torch.long, device=self.device)
+        self._attention_mask_buffer = torch.zeros(input_shape, dtype=torch.long, device=self.device)
+        self._predict_lock = threading.Lock()
+        
+        # Training parameters
+        self.batch_size = 16
+        self.learning_rate = 2e-5
+        self.num_epochs = 3
+        self.max_grad_norm = 1.0
+        self.accum_steps = 4  # Micro-batches per optimizer step
+        
+        # Mixed precision: BF16 where supported, otherwise FP16 with loss scaling
+        self.use_amp = self.device.type == 'cuda'
+        if self.use_amp and torch.cuda.is_bf16_supported():
+            self.amp_dtype = torch.bfloat16
+        elif self.use_amp:
+            self.amp_dtype = torch.float16
+        else:
+            self.amp_dtype = torch.bfloat16
+        self.scaler = torch.amp.GradScaler('cuda', enabled=self.use_amp and self.amp_dtype == torch.float16)
+        
+        # Half-precision activations leave room for a larger micro-batch
+        if self.use_amp:
+            self.batch_size = 32
+        
+    def build_model(self):
+        """Load the pretrained backbone with a classification head and move it to the device"""
         # Initialize model with a simpler approach
         try:
             # Try loading the model directly
             self.model = AutoModelForSequenceClassification.from_pretrained(
-                model_name,
-                num_labels=num_labels,
+                self.model_name,
+                num_labels=self.num_labels,
                 ignore_mismatched_sizes=True
             )
-            self.logger.info(f"Successfully loaded model {model_name}")
+            self.model._pretrained_loaded = True
+            self.logger.info(f"Successfully loaded model {self.model_name}")
         except Exception as e:
             self.logger.warning(f"Standard model initialization failed: {e}")
             # Fallback approach using a different method
             from transformers import BertConfig, BertForSequenceClassification
-            config = BertConfig.from_pretrained(model_name, num_labels=num_labels)
+            config = BertConfig.from_pretrained(self.model_name, num_labels=self.num_labels)
             self.model = BertForSequenceClassification(config)
             self.logger.info("Created new model with config")
             # Load weights if possible
             try:
-                pretrained_model = AutoModelForSequenceClassification.from_pretrained(model_name)
+                pretrained_model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
                 self.model.load_state_dict(pretrained_model.state_dict(), strict=False)
+                self.model._pretrained_loaded = True
                 self.logger.info("Loaded pretrained weights")
             except Exception as e:
                 self.logger.warning(f"Could not load pretrained weights: {e}")
         
         self.model.to(self.device)
+        self._compile_predict_model()
         
-        # Initialize data processor
-        self.data_processor = DataProcessor(model_name)
+    def snapshot_weights(self) -> Dict[str, torch.Tensor]:
+        """Copy of the current weights on the CPU, to restore with reset_weights"""
+        return {k: v.detach().cpu().clone() for k, v in self.model.state_dict().items()}
+    
+    def reset_weights(self, snapshot: Dict[str, torch.Tensor]):
+        """Restore weights from a snapshot instead of rebuilding and re-initializing the model"""
+        # Copies into the existing device tensors, so the compiled predict model stays valid
+        self.model.load_state_dict(snapshot)
         
-        # Training parameters
-        self.batch_size = 16
-        self.learning_rate = 2e-5
-        self.num_epochs = 3
-        self.max_grad_norm = 1.0
+    @classmethod
+    def get(cls, model_name: str = "bert-base-uncased", num_labels: int = 6) -> 'ModelTrainer':
+        """Get a cached trainer for the model, creating it on first use"""
+        key = (model_name, num_labels)
+        with _MODEL_CACHE_LOCK:
+            if key not in _MODEL_CACHE:
+                _MODEL_CACHE[key] = cls(model_name, num_labels)
+            return _MODEL_CACHE[key]
+        
+    def _compile_predict_model(self):
+        """Compile the model for single-text prediction on CUDA (inputs have a static shape)"""
+        if self.device.type == 'cuda' and hasattr(torch, 'compile'):
+            self._predict_model = torch.compile(self.model, mode='reduce-overhead', dynamic=False)
+        else:
+            self._predict_model = self.model
+        
+    def _autocast(self):
+        """Autocast context for forward passes (no-op on CPU)"""
+        return torch.autocast(device_type=self.device.type, dtype=self.amp_dtype, enabled=self.use_amp)
         
     def train_epoch(self, train_loader: DataLoader, optimizer: torch.optim.Optimizer) -> float:
         """Train for one epoch"""
         self.model.train()
         total_loss = 0
+        num_batches = len(train_loader)
+        
+        # Small datasets would get only a handful of optimizer steps per epoch, so the window
+        # shrinks until there are at least as many steps as micro-batches per step
+        accum_steps = max(1, min(self.accum_steps, math.isqrt(num_batches)))
+        if accum_steps != self.accum_steps:
+            self.logger.info(
+                f"Accumulating gradients over {accum_steps} micro-batches instead of {self.accum_steps} "
+                f"({num_batches} batches per epoch)"
+            )
         
-        for batch in train_loader:
+        for step, batch in enumerate(train_loader):
             # Move batch to device
-            input_ids = batch['input_ids'].to(self.device)
-            attention_mask = batch['attention_mask'].to(self.device)
-            labels = batch['labels'].to(self.device)
+            input_ids = batch['input_ids'].to(self.device, non_blocking=True)
+            attention_mask = batch['attention_mask'].to(self.device, non_blocking=True)
+            labels = batch['labels'].to(self.device, non_blocking=True)
             
             # Forward pass
-            outputs = self.model(
-                input_ids=input_ids,
-                attention_mask=attention_mask,
-                labels=labels
-            )
+            with self._autocast():
+                outputs = self.model(
+                    input_ids=input_ids,
+                    attention_mask=attention_mask,
+                    labels=labels
+                )
             
             loss = outputs.loss
             total_loss += loss.item()
             
-            # Backward pass
-            loss.backward()
-            torch.nn.utils.clip_grad_norm_(self.model.parameters(), self.max_grad_norm)
-            optimizer.step()
-            optimizer.zero_grad()
+            # Backward pass, averaging gradients over the accumulation window
+            # (the last window of the epoch may be shorter)
+            window_start = step - step % accum_steps
+            window_size = min(accum_steps, num_batches - window_start)
+            self.scaler.scale(loss / window_size).backward()
+            
+            # Optimizer step at the end of each window (gradients are unscaled before clipping)
+            if step + 1 == window_start + window_size:
+                self.scaler.unscale_(optimizer)
+                torch.nn.utils.clip_grad_norm_(self.model.parameters(), self.max_grad_norm)
+                self.scaler.step(optimizer)
+                self.scaler.update()
+                optimizer.zero_grad(set_to_none=True)
         
         return total_loss / len(train_loader)
     
@@ -90,11 +175,11 @@ class ModelTrainer:
         all_preds = []
         all_labels = []
         
-        with torch.no_grad():
+        with torch.inference_mode(), self._autocast():
             for batch in eval_loader:
-                input_ids = batch['input_ids'].to(self.device)
-                attention_mask = batch['attention_mask'].to(self.device)
-                labels = batch['labels'].to(self.device)
+                input_ids = batch['input_ids'].to(self.device, non_blocking=True)
+                attention_mask = batch['attention_mask'].to(self.device, non_blocking=True)
+                labels = batch['labels'].to(self.device, non_blocking=True)
                 
                 outputs = self.model(
                     input_ids=input_ids,
@@ -118,17 +203,29 @@ class ModelTrainer:
             'f1': f1
         }
     
+    def preload(self, dataset_name: str):
+        """Load and tokenize the train/valid splits of a dataset ahead of training"""
+        self.data_processor.get_dataset(dataset_name, 'train')
+        self.data_processor.get_dataset(dataset_name, 'valid')
+    
     def train(self, dataset_name: str) -> Dict[str, float]:
         """Train the model on a specific dataset"""
         self.logger.info(f"Training on {dataset_name} dataset...")
         
-        # Get data loaders
-        data_loaders = self.data_processor.get_data_loaders(self.batch_size)
-        train_loader = data_loaders[f'{dataset_name}_train']
-        valid_loader = data_loaders[f'{dataset_name}_valid']
+        # Get data loaders (only the requested dataset is loaded and tokenized)
+        train_loader = self.data_processor.get_loader(dataset_name, 'train', self.batch_size, shuffle=True)
+        valid_loader = self.data_processor.get_loader(dataset_name, 'valid', self.batch_size)
+        
+        # The optimizer and GradScaler need FP32 master weights; upcast a model loaded for inference
+        if next(self.model.parameters()).dtype != torch.float32:
+            self.model.float()
         
-        # Initialize optimizer
-        optimizer = AdamW(self.model.parameters(), lr=self.learning_rate)
+        # Initialize optimizer (fused CUDA kernel when available)
+        try:
+            optimizer = AdamW(self.model.parameters(), lr=self.learning_rate, fused=torch.cuda.is_available())
+        except TypeError:
+            # Older PyTorch without the fused implementation
+            optimizer = AdamW(self.model.parameters(), lr=self.learning_rate, foreach=True)
         
         # Training loop
         best_f1 = 0
@@ -158,13 +255,23 @@ class ModelTrainer:
         save_dir = Path(__file__).parent / 'models' / model_name
         save_dir.mkdir(parents=True, exist_ok=True)
         
-        self.model.save_pretrained(save_dir)
+        # safetensors can be memory-mapped on load and avoids pickle
+        self.model.save_pretrained(save_dir, safe_serialization=True)
         self.logger.info(f"Model saved to {save_dir}")
     
     def load_model(self, model_path: str):
         """Load a saved model"""
-        self.model = AutoModelForSequenceClassification.from_pretrained(model_path)
+        # Materialize weights directly in the autocast dtype on CUDA to halve host memory and
+        # host-to-device copies, without a re-cast on every forward pass
+        dtype = self.amp_dtype if self.use_amp else torch.float32
+        self.model = AutoModelForSequenceClassification.from_pretrained(
+            model_path,
+            dtype=dtype,
+            low_cpu_mem_usage=True
+        )
+        self.model._pretrained_loaded = True
         self.model.to(self.device)
+        self._compile_predict_model()
         self.logger.info(f"Model loaded from {model_path}")
     
     def predict(self, text: str) -> Tuple[int, float]:
@@ -175,25 +282,27 @@ class ModelTrainer:
         encoding = self.data_processor.tokenizer(
             text,
             add_special_tokens=True,
-            max_length=512,
+            max_length=self.data_processor.max_length,
             padding='max_length',
             truncation=True,
             return_tensors='pt'
         )
         
-        # Move to device
-        input_ids = encoding['input_ids'].to(self.device)
-        attention_mask = encoding['attention_mask'].to(self.device)
-        
-        # Predict
-        with torch.no_grad():
-            outputs = self.model(
-                input_ids=input_ids,
-                attention_mask=attention_mask
-            )
+        # The buffers are shared, so concurrent predictions on a cached trainer are serialized
+        with self._predict_lock:
+            # Copy into the persistent device buffers instead of allocating new tensors
+            input_ids = self._input_ids_buffer.copy_(encoding['input_ids'])
+            attention_mask = self._attention_mask_buffer.copy_(encoding['attention_mask'])
             
-            probs = torch.softmax(outputs.logits, dim=1)
-            pred = torch.argmax(probs, dim=1)
-            confidence = probs[0][pred].item()
+            # Predict
+            with torch.inference_mode(), self._autocast():
+                outputs = self._predict_model(
+                    input_ids=input_ids,
+                    attention_mask=attention_mask
+                )
+                
+                probs = torch.softmax(outputs.logits, dim=1)
+                pred = torch.argmax(probs, dim=1)
+                confidence = probs[0][pred].item()
         
         return pred.item(), confidence 
\ No newline at end of file
@@ -8,20 +8,33 @@ import os
 import pickle
 import numpy as np
 import re
+from functools import lru_cache
 from pathlib import Path
+import nltk
 from nltk.corpus import stopwords
 from nltk.stem.porter import PorterStemmer
 
-# Download stopwords if not available (silent)
-try:
-    import nltk
-    nltk.download('stopwords', quiet=True)
-except:
-    pass
-
-# Initialize stemmer
+# Initialize stemmer (PorterStemmer matches the stems the TF-IDF vocabulary was fitted on)
 ps = PorterStemmer()
 
+# Stemming is memoized per word since the same words recur across articles
+_stem = lru_cache(maxsize=65536)(ps.stem)
+_NONALPHA = re.compile('[^a-zA-Z]+')
+
+# Stopwords are read once at import instead of on every call
+try:
+    STOP_WORDS = frozenset(stopwords.words('english'))
+except LookupError:
+    # Download stopwords only if not available (silent)
+    try:
+        nltk.download('stopwords', quiet=True)
+        STOP_WORDS = frozenset(stopwords.words('english'))
+    except Exception:
+        STOP_WORDS = frozenset()
+except Exception:
+    # Fallback if stopwords not available
+    STOP_WORDS = frozenset()
+
 # Global variables for models (loaded once)
 models_loaded = False
 B = None  # Bernoulli Naive Bayes
@@ -30,6 +43,49 @@ PCA = None  # PCA-based model
 rf = None  # Random Forest
 tfidfvect = None  # TF-IDF Vectorizer
 
+class OnnxClassifier:
+    """ONNX Runtime session exposing the sklearn predict/predict_proba interface"""
+    def __init__(self, path):
+        import onnxruntime
+        
+        # One thread per session, requests are parallelized by the server
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            str(path), sess_options=options, providers=['CPUExecutionProvider']
+        )
+        self.input_name = self.session.get_inputs()[0].name
+    
+    def _run(self, X):
+        # ONNX Runtime needs a dense input; cast while still sparse so only a float32 copy is made
+        if hasattr(X, 'toarray'):
+            X = X.astype(np.float32).toarray()
+        else:
+            X = np.asarray(X, dtype=np.float32)
+        return self.session.run(None, {self.input_name: X})
+    
+    def predict(self, X):
+        return self._run(X)[0]
+    
+    def predict_proba(self, X):
+        return self._run(X)[1]
+    
+    def predict_with_proba(self, X):
+        """Labels and probabilities from a single session run"""
+        labels, probabilities = self._run(X)[:2]
+        return labels, probabilities
+
+def load_onnx_model(path):
+    """Load an ONNX export of a model if present (requires the optional onnxruntime), otherwise None"""
+    if not path.exists():
+        return None
+    
+    try:
+        return OnnxClassifier(path)
+    except Exception as e:
+        print(f"Warning: Could not load ONNX model {path.name}, using pickle: {e}", file=sys.stderr)
+        return None
+
 def load_models():
     """Load all ML models and vectorizer (lazy loading)"""
     global models_loaded, B, DCT, PCA, rf, tfidfvect
@@ -56,6 +112,7 @@ def load_models():
             raise FileNotFoundError("Could not find model files. Please ensure models are in the correct location.")
         
         # Load models with error handling for version incompatibilities
+        # Tree models prefer ONNX exports (see scripts/convert_models_to_onnx.py) when available
         import warnings
         warnings.filterwarnings('ignore', category=UserWarning)
         
@@ -66,7 +123,7 @@ def load_models():
             B = None
         
         try:
-            DCT = pickle.load(open(model_dir / 'modelDTC.pkl', 'rb'))
+            DCT = load_onnx_model(model_dir / 'modelDTC.onnx') or pickle.load(open(model_dir / 'modelDTC.pkl', 'rb'))
         except Exception as e:
             print(f"Warning: Could not load Decision Tree model (version incompatibility): {e}", file=sys.stderr)
             DCT = None
@@ -78,7 +135,7 @@ def load_models():
             PCA = None
         
         try:
-            rf = pickle.load(open(model_dir / 'rfmodel.pkl', 'rb'))
+            rf = load_onnx_model(model_dir / 'rfmodel.onnx') or pickle.load(open(model_dir / 'rfmodel.pkl', 'rb'))
         except Exception as e:
             print(f"Warning: Could not load Random Forest model: {e}", file=sys.stderr)
             rf = None
@@ -99,6 +156,7 @@ def load_models():
         print(f"Error loading models: {e}", file=sys.stderr)
         raise
 
+@lru_cache(maxsize=4096)
 def preprocess_text(text):
     """
     Preprocess text for model prediction
@@ -107,59 +165,65 @@ def preprocess_text(text):
     - Remove stopwords
     - Apply stemming
     """
-    # Remove non-alphabetic characters
-    review = re.sub('[^a-zA-Z]', ' ', text)
-    # Convert to lowercase
-    review = review.lower()
-    # Split into words
-    review = review.split()
-    # Remove stopwords and apply stemming
-    try:
-        stop_words = set(stopwords.words('english'))
-    except:
-        # Fallback if stopwords not available
-        stop_words = set()
-    
-    review = [ps.stem(word) for word in review if word not in stop_words]
-    # Rejoin
-    review = ' '.join(review)
-    return review
+    # Remove non-alphabetic characters, convert to lowercase and split into words
+    words = _NONALPHA.sub(' ', text).lower().split()
+    # Remove stopwords, apply stemming and rejoin
+    return ' '.join(_stem(word) for word in words if word not in STOP_WORDS)
 
+@lru_cache(maxsize=1024)
 def predict_ensemble(text):
     """
     Predict using ensemble of 4 models
     Returns: (prediction_label, confidence_score)
     - prediction_label: "FAKE" or "REAL"
     - confidence_score: numpy array with probabilities
+    Results are cached on the raw text, so repeated queries short-circuit.
+    """
+    return predict_ensemble_batch([text])[0]
+
+def _call_sparse(method, review_vect):
+    """Call an estimator method on sparse input, densifying only if the estimator rejects it"""
+    try:
+        return method(review_vect)
+    except TypeError:
+        # sklearn raises TypeError for sparse input when dense data is required
+        return method(review_vect.toarray())
+
+def predict_ensemble_batch(texts):
+    """
+    Predict a batch of texts using ensemble of 4 models
+    Each model runs once on the whole TF-IDF matrix instead of once per text
+    Returns: list of (prediction_label, confidence_score), one per text
     """
     # Load models if not already loaded
     load_models()
     
-    # Preprocess text
-    processed_text = preprocess_text(text)
+    # Preprocess texts
+    processed_texts = [preprocess_text(text) for text in texts]
     
-    # Vectorize
-    review_vect = tfidfvect.transform([processed_text]).toarray()
+    # Vectorize into a single sparse matrix (the sklearn models accept sparse input directly)
+    review_vect = tfidfvect.transform(processed_texts)
     
     # Get predictions from each model (only use models that loaded successfully)
+    # Each entry is an array with one value per text
     predictions = []
     prob_values = []
     
     # Model 1: Bernoulli Naive Bayes
     if B is not None:
         try:
-            score1 = B.decision_function(review_vect)
+            score1 = _call_sparse(B.decision_function, review_vect)
             proba1 = 1 / (1 + np.exp(-score1))
-            prediction1 = B.predict(review_vect)[0]
+            prediction1 = _call_sparse(B.predict, review_vect)
             predictions.append(prediction1)
-            prob_values.append(float(proba1[0]) if isinstance(proba1, np.ndarray) else float(proba1))
+            prob_values.append(proba1)
         except Exception as e:
             print(f"Warning: Bernoulli Naive Bayes prediction failed: {e}", file=sys.stderr)
     
     # Model 2: Decision Tree Classifier
     if DCT is not None:
         try:
-            prediction2 = DCT.predict(review_vect)[0]
+            prediction2 = _call_sparse(DCT.predict, review_vect)
             predictions.append(prediction2)
         except Exception as e:
             print(f"Warning: Decision Tree prediction failed: {e}", file=sys.stderr)
@@ -167,11 +231,11 @@ def predict_ensemble(text):
     # Model 3: PCA-based model
     if PCA is not None:
         try:
-            score3 = PCA.decision_function(review_vect)
+            score3 = _call_sparse(PCA.decision_function, review_vect)
             proba3 = 1 / (1 + np.exp(-score3))
-            prediction3 = PCA.predict(review_vect)[0]
+            prediction3 = _call_sparse(PCA.predict, review_vect)
             predictions.append(prediction3)
-            prob_values.append(float(proba3[0]) if isinstance(proba3, np.ndarray) else float(proba3))
+            prob_values.append(proba3)
         except Exception as e:
             print(f"Warning: PCA model prediction failed: {e}", file=sys.stderr)
     
@@ -179,11 +243,15 @@ def predict_ensemble(text):
     if rf is not None:
         try:
             # Fix: predict_proba returns array of [prob_class_0, prob_class_1]
-            proba4_array = rf.predict_proba(review_vect)[0]
-            proba4 = proba4_array[1]  # Probability of class 1 (REAL)
-            prediction4 = rf.predict(review_vect)[0]
+            if isinstance(rf, OnnxClassifier):
+                # One forest evaluation returns both outputs
+                prediction4, proba4 = rf.predict_with_proba(review_vect)
+                proba4 = proba4[:, 1]  # Probability of class 1 (REAL)
+            else:
+                proba4 = _call_sparse(rf.predict_proba, review_vect)[:, 1]  # Probability of class 1 (REAL)
+                prediction4 = _call_sparse(rf.predict, review_vect)
             predictions.append(prediction4)
-            prob_values.append(float(proba4))
+            prob_values.append(proba4)
         except Exception as e:
             print(f"Warning: Random Forest prediction failed: {e}", file=sys.stderr)
     
@@ -193,22 +261,20 @@ def predict_ensemble(text):
     
     # Ensemble prediction (average of all available predictions)
     # Models predict: 0 = FAKE, 1 = REAL
-    final_predict = np.mean(predictions) if predictions else 0.5
-    
-    # Determine label
-    if final_predict < 0.5:
-        prediction_label = "FAKE"
-    else:
-        prediction_label = "REAL"
+    final_predict = np.mean(np.column_stack(predictions), axis=1)
     
     # Calculate confidence (average of available probabilities)
     if prob_values:
-        final_prob = np.mean(prob_values)
+        final_prob = np.mean(np.column_stack(prob_values), axis=1)
     else:
         # Fallback: use prediction value as confidence
-        final_prob = abs(final_predict - 0.5) * 2  # Convert to 0-1 scale
+        final_prob = np.abs(final_predict - 0.5) * 2  # Convert to 0-1 scale
     
-    return prediction_label, final_prob
+    # Determine labels
+    return [
+        ("FAKE" if predict < 0.5 else "REAL", prob)
+        for predict, prob in zip(final_predict, final_prob)
+    ]
 
 def convert_to_liar_scale(prediction_label, confidence):
     """
@@ -244,6 +310,24 @@ def main():
         print(json.dumps([3, 0.5]))
         sys.exit(0)
     
+    if len(sys.argv) > 2:
+        # Several texts: predict them in a single batch and return one pair per text
+        texts = sys.argv[1:]
+        results = [[3, 0.5] for _ in texts]
+        valid = [i for i, text in enumerate(texts) if text and len(text.strip()) > 0]
+        
+        if valid:
+            try:
+                predictions = predict_ensemble_batch([texts[i] for i in valid])
+                for i, (prediction_label, confidence) in zip(valid, predictions):
+                    results[i] = [convert_to_liar_scale(prediction_label, confidence), float(confidence)]
+            except Exception as e:
+                # Error in prediction - use fallback for every text
+                print(f"Prediction error: {e}. Using fallback prediction.", file=sys.stderr)
+        
+        print(json.dumps(results))
+        sys.exit(0)
+    
     text = sys.argv[1]
     
     if not text or len(text.strip()) == 0:
@@ -0,0 +1,82 @@
+"""
+Test script for the dataset loading and batching code
+Run this to verify the data pipeline works correctly
+"""
+import logging
+import tempfile
+from pathlib import Path
+import numpy as np
+import torch
+from dataProcessor import DataProcessor, LengthBucketBatchSampler, collate_dynamic_padding
+
+# A LIAR-shaped TSV: [id, label, statement, subject, speaker, ...]
+LIAR_ROWS = [
+    "1.json\tfalse\tSays the budget doubled last year.\teconomy\tjohn-doe",
+    "2.json\ttrue\tThe state added 10,000 jobs in \"May\".\tjobs\tjane-doe",
+    "3.json\tpants-fire\tThe moon is made of cheese.\tscience\tanon",
+]
+
+def _bare_processor(liar_dir: Path) -> DataProcessor:
+    """DataProcessor pointed at a test directory, skipping the tokenizer download"""
+    processor = DataProcessor.__new__(DataProcessor)
+    processor.logger = logging.getLogger(__name__)
+    processor.liar_dir = liar_dir
+    return processor
+
+def test_load_liar_dataset():
+    """LIAR splits come back as (statement, numeric label) pairs"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        liar_dir = Path(tmp_dir)
+        for split in ['train', 'valid', 'test']:
+            (liar_dir / f'{split}.tsv').write_text('\n'.join(LIAR_ROWS) + '\n')
+
+        data = _bare_processor(liar_dir).load_liar_dataset()
+
+    for split in ['train', 'valid', 'test']:
+        texts, labels = data[split]
+        assert list(texts) == [
+            "Says the budget doubled last year.",
+            "The state added 10,000 jobs in \"May\".",
+            "The moon is made of cheese."
+        ], texts
+        assert labels.tolist() == [1, 5, 0], labels
+    print("✓ PASS load_liar_dataset")
+
+def test_length_bucket_batch_sampler():
+    """Batches cover the split once, group similar lengths and keep a split smaller than one batch"""
+    lengths = np.array([5, 1, 9, 3, 7, 2, 8])
+
+    batches = list(LengthBucketBatchSampler(lengths, 3))
+    assert batches == [[1, 5, 3], [0, 4, 6], [2]], batches
+
+    batches = list(LengthBucketBatchSampler(lengths, 3, shuffle=True, drop_last=True))
+    assert len(batches) == 2 and all(len(batch) == 3 for batch in batches), batches
+    for batch in batches:
+        assert lengths[batch].tolist() == sorted(lengths[batch].tolist()), batches
+
+    sampler = LengthBucketBatchSampler(np.array([3, 4]), 3, shuffle=True, drop_last=True)
+    batches = list(sampler)
+    assert len(sampler) == 1 and sorted(batches[0]) == [0, 1], batches
+    print("✓ PASS LengthBucketBatchSampler")
+
+def test_collate_dynamic_padding():
+    """Batches are trimmed to the longest sample, not max_length"""
+    def item(length, label):
+        mask = torch.zeros(8, dtype=torch.int32)
+        mask[:length] = 1
+        return {'input_ids': torch.arange(8, dtype=torch.int32) * mask, 'attention_mask': mask, 'labels': torch.tensor(label)}
+
+    batch = collate_dynamic_padding([item(2, 0), item(5, 1)])
+    assert batch['input_ids'].shape == (2, 5), batch['input_ids'].shape
+    assert batch['attention_mask'].tolist() == [[1, 1, 0, 0, 0], [1, 1, 1, 1, 1]]
+    assert batch['input_ids'][1].tolist() == [0, 1, 2, 3, 4]
+    assert batch['labels'].tolist() == [0, 1]
+    print("✓ PASS collate_dynamic_padding")
+
+if __name__ == "__main__":
+    print("Testing data pipeline\n" + "="*60)
+    test_load_liar_dataset()
+    test_length_bucket_batch_sampler()
+    test_collate_dynamic_padding()
+    print("="*60)
+    print("Test completed!")
@@ -4,7 +4,15 @@ Run this to verify the integration works correctly
 """
 import sys
 import json
-from predict import predict_ensemble, convert_to_liar_scale
+import subprocess
+from pathlib import Path
+from predict import predict_ensemble, predict_ensemble_batch, convert_to_liar_scale
+
+BATCH_TEXTS = [
+    "This is a legitimate news article about current events with verified sources and factual information.",
+    "SHOCKING! Scientists discover SECRET that will BLOW YOUR MIND! They don't want you to know this!",
+    "According to verified sources, the government announced new policies today.",
+]
 
 def test_prediction():
     """Test the prediction function with sample texts"""
@@ -44,6 +52,48 @@ def test_prediction():
     print("\n" + "="*60)
     print("Test completed!")
 
+def test_batch_prediction():
+    """Test that a batch prediction matches predicting each text on its own"""
+    print("\nTesting batch prediction\n" + "="*60)
+    
+    try:
+        batch_results = predict_ensemble_batch(BATCH_TEXTS)
+        assert len(batch_results) == len(BATCH_TEXTS)
+        
+        for text, (batch_label, batch_confidence) in zip(BATCH_TEXTS, batch_results):
+            single_label, single_confidence = predict_ensemble(text)
+            assert batch_label == single_label, (text, batch_label, single_label)
+            assert abs(float(batch_confidence) - float(single_confidence)) < 1e-9, (text, batch_confidence, single_confidence)
+        print("✓ PASS")
+    except Exception as e:
+        print(f"✗ ERROR: {e}")
+
+def test_cli_batch():
+    """Test that the CLI returns one [prediction, confidence] pair per text argument"""
+    print("\nTesting command-line batch output\n" + "="*60)
+    
+    script = Path(__file__).parent / 'predict.py'
+    # The empty text gets the fallback prediction without failing the rest of the batch
+    texts = BATCH_TEXTS + [""]
+    
+    try:
+        output = subprocess.run(
+            [sys.executable, str(script), *texts], capture_output=True, text=True, check=True
+        ).stdout
+        results = json.loads(output)
+        assert len(results) == len(texts), results
+        assert results[-1] == [3, 0.5], results
+        
+        for text, (liar_prediction, confidence) in zip(BATCH_TEXTS, results):
+            prediction_label, expected_confidence = predict_ensemble(text)
+            assert liar_prediction == convert_to_liar_scale(prediction_label, expected_confidence), (text, results)
+            assert abs(confidence - float(expected_confidence)) < 1e-6, (text, results)
+        print("✓ PASS")
+    except Exception as e:
+        print(f"✗ ERROR: {e}")
+
 if __name__ == "__main__":
     test_prediction()
+    test_batch_prediction()
+    test_cli_batch()
 
@@ -0,0 +1,67 @@
+"""
+Test script for the bucketed weight initializer
+Run this to verify init_empty_weights works correctly
+"""
+import math
+import torch
+import torch.nn as nn
+from weightInitializer import init_empty_weights
+
+def _build_model():
+    """Small model with repeated and unique weight shapes plus bias/norm vectors"""
+    return nn.Sequential(
+        nn.Linear(16, 32),
+        nn.Linear(32, 32),
+        nn.Linear(32, 32),
+        nn.LayerNorm(32),
+        nn.Linear(32, 4)
+    )
+
+def test_xavier_buckets():
+    """Every matrix gets its own Xavier-bounded values and every vector is zeroed"""
+    model = init_empty_weights(_build_model())
+
+    for name, param in model.named_parameters():
+        if param.ndim > 1:
+            fan_out, fan_in = param.shape
+            bound = math.sqrt(6.0 / (fan_in + fan_out))
+            assert param.abs().max() <= bound, name
+            assert param.std() > 0, name
+        else:
+            assert torch.count_nonzero(param) == 0, name
+        assert param.requires_grad, name
+
+    # Matrices sharing a bucket are filled from one draw but must not share values
+    assert not torch.equal(model[1].weight, model[2].weight)
+    print("✓ PASS xavier buckets")
+
+def test_seeded_generator():
+    """The same seed gives the same weights, independent of the global RNG"""
+    torch.manual_seed(1)
+    first = init_empty_weights(_build_model(), seed=123)
+    torch.manual_seed(2)
+    second = init_empty_weights(_build_model(), seed=123)
+
+    for (name, a), b in zip(first.named_parameters(), second.parameters()):
+        assert torch.equal(a, b), name
+    print("✓ PASS seeded generator")
+
+def test_skip_pretrained_and_meta():
+    """Pretrained models are left untouched and meta mode drops the storage"""
+    model = _build_model()
+    model._pretrained_loaded = True
+    before = [param.clone() for param in model.parameters()]
+    init_empty_weights(model)
+    assert all(torch.equal(a, b) for a, b in zip(before, model.parameters()))
+
+    model = init_empty_weights(_build_model(), mode='meta')
+    assert all(param.is_meta for param in model.parameters())
+    print("✓ PASS skip pretrained and meta")
+
+if __name__ == "__main__":
+    print("Testing weight initializer\n" + "="*60)
+    test_xavier_buckets()
+    test_seeded_generator()
+    test_skip_pretrained_and_meta()
+    print("="*60)
+    print("Test completed!")
@@ -1,15 +1,67 @@
+import math
+from collections import defaultdict
 import torch
 
-def init_empty_weights(model):
+def _xavier_bound(shape, gain=1.0):
+    """Xavier uniform bound for a weight shape, computed without touching the tensor"""
+    receptive_field = math.prod(shape[2:])
+    fan_in = shape[1] * receptive_field
+    fan_out = shape[0] * receptive_field
+    return gain * math.sqrt(6.0 / (fan_in + fan_out))
+
+@torch.no_grad()
+def init_empty_weights(model, mode='xavier', skip_if_pretrained=True, gain=1.0, seed=None):
     """
     Initialize empty weights for a model.
-    
+
+    Parameters are bucketed by (dtype, device, shape) so each bucket is filled
+    with a single RNG call and vectors are zeroed with one fused launch.
+
     Args:
         model: The model to initialize weights for
+        mode: 'xavier' to fill the weights, or 'meta' to move the parameters to the
+            meta device so they carry no storage (use model.to_empty() to allocate later)
+        skip_if_pretrained: Leave the weights untouched if the model is flagged with
+            _pretrained_loaded, instead of overwriting the loaded checkpoint
+        gain: Scaling factor for the Xavier bound
+        seed: If given, draw from a dedicated generator per device seeded with it,
+            instead of the global RNG
     """
+    if mode == 'meta':
+        return model.to(torch.device('meta'))
+    if mode != 'xavier':
+        raise ValueError(f"Unknown init mode: {mode}")
+    if skip_if_pretrained and getattr(model, '_pretrained_loaded', False):
+        return model
+
+    vectors = []
+    buckets = defaultdict(list)
     for param in model.parameters():
-        if len(param.shape) > 1:
-            torch.nn.init.xavier_uniform_(param)
+        # ndim is a plain int; the shape tuple is only built for matrices that need a bucket key
+        if param.ndim > 1:
+            buckets[(param.dtype, param.device, tuple(param.shape))].append(param)
+        else:
+            vectors.append(param)
+
+    if vectors:
+        torch._foreach_zero_(vectors)
+
+    generators = {}
+    for (dtype, device, shape), params in buckets.items():
+        # Xavier uniform bound, computed once per shape and shared by the bucket
+        bound = _xavier_bound(shape, gain)
+
+        generator = None
+        if seed is not None:
+            if device not in generators:
+                generators[device] = torch.Generator(device=device).manual_seed(seed)
+            generator = generators[device]
+
+        values = torch.empty((len(params),) + shape, dtype=dtype, device=device)
+        values.uniform_(-bound, bound, generator=generator)
+        if hasattr(torch, '_foreach_copy_'):
+            torch._foreach_copy_(params, list(values.unbind(0)))
         else:
-            torch.nn.init.zeros_(param)
-    return model 
\ No newline at end of file
+            for param, value in zip(params, values):
+                param.copy_(value)
+    return model
\ No newline at end of file
@@ -0,0 +1,48 @@
+"""
+Export the pickled tree models to ONNX for predict.py
+Run from the repository root: python -m server.scripts.convert_models_to_onnx
+Requires the optional skl2onnx package (and onnxruntime to serve the exports)
+"""
+import logging
+import pickle
+from pathlib import Path
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import FloatTensorType
+
+MODEL_DIR = Path(__file__).resolve().parent.parent / 'lib' / 'fakenews-models'
+
+# Tree models gain the most from ONNX Runtime; the linear models stay pickled
+MODELS = ['modelDTC', 'rfmodel']
+
+def setup_logging():
+    """Setup logging configuration"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    return logging.getLogger(__name__)
+
+def main():
+    """Convert the pickled tree models to ONNX next to the originals"""
+    logger = setup_logging()
+
+    # The input dimension is the size of the TF-IDF vocabulary
+    tfidfvect = pickle.load(open(MODEL_DIR / 'tfidfvect2.pkl', 'rb'))
+    n_features = len(tfidfvect.vocabulary_)
+
+    for name in MODELS:
+        model = pickle.load(open(MODEL_DIR / f'{name}.pkl', 'rb'))
+
+        # zipmap=False returns probabilities as a plain tensor instead of a list of dicts
+        onnx_model = convert_sklearn(
+            model,
+            initial_types=[('X', FloatTensorType([None, n_features]))],
+            options={id(model): {'zipmap': False}}
+        )
+
+        output_file = MODEL_DIR / f'{name}.onnx'
+        output_file.write_bytes(onnx_model.SerializeToString())
+        logger.info(f"Saved {output_file}")
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,126 @@
-import sys
-from pathlib import Path
-
-# Add the parent directory to the Python path
-current_dir = Path(__file__).parent
-parent_dir = current_dir.parent
-sys.path.append(str(parent_dir))
-
+"""
+Train the BERT models on all datasets
+Run from the repository root: python -m server.scripts.train_model
+"""
 import logging
-import json
+import os
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
-from lib.modelTrainer import ModelTrainer
+from pathlib import Path
+import orjson
+import torch
+from server.lib.modelTrainer import ModelTrainer
+
+# Resolved once instead of on every save
+MODELS_DIR = Path(__file__).resolve().parent.parent / 'models'
+LATEST_RESULTS_FILE = 'training_results_latest.json'
+PROGRESS_FILE = 'training_progress.ndjson'
 
 def setup_logging():
     """Setup logging configuration"""
+    # The format uses neither thread nor process info, so skip collecting it per record
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    
     logging.basicConfig(
         level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        force=True
     )
     return logging.getLogger(__name__)
 
+def _train_one(dataset: str, device_index: int) -> dict:
+    """Train a fresh model on one dataset on its own GPU (runs in a worker process)"""
+    setup_logging()
+    torch.cuda.set_device(device_index)
+    
+    trainer = ModelTrainer()
+    return trainer.train(dataset)
+
 def main():
     """Main training function"""
     logger = setup_logging()
     logger.info("Starting model training...")
     
-    # Initialize model trainer
-    trainer = ModelTrainer()
-    
     # Train on each dataset
     datasets = ['liar', 'politifact', 'buzzfeed']
     results = {}
     
-    for dataset in datasets:
-        logger.info(f"Training on {dataset} dataset...")
-        metrics = trainer.train(dataset)
-        results[dataset] = metrics
+    # In-flight progress is appended one line per dataset; the combined JSON is written once at the end
+    MODELS_DIR.mkdir(parents=True, exist_ok=True)
+    with open(MODELS_DIR / PROGRESS_FILE, 'ab') as progress_file:
+        # ModelTrainer.train logs the start of each dataset; this is the single log line at its end
+        def record_progress(dataset: str, metrics: dict):
+            logger.info("dataset=%s status=done accuracy=%.4f f1=%.4f", dataset, metrics['accuracy'], metrics['f1'])
+            progress_file.write(orjson.dumps({'dataset': dataset, 'metrics': metrics}, option=orjson.OPT_SERIALIZE_NUMPY) + b'\n')
+            progress_file.flush()
         
-        # Save results after each dataset
-        save_results(results)
+        if torch.cuda.device_count() >= len(datasets):
+            # One GPU per dataset: train them concurrently, each process with its own CUDA context
+            with ProcessPoolExecutor(max_workers=len(datasets), mp_context=multiprocessing.get_context('spawn')) as executor:
+                futures = {executor.submit(_train_one, dataset, i): dataset for i, dataset in enumerate(datasets)}
+                
+                for future in as_completed(futures):
+                    dataset = futures[future]
+                    results[dataset] = future.result()
+                    record_progress(dataset, results[dataset])
+        else:
+            # Shared device: train in sequence, loading the next dataset while the current one trains
+            trainer = ModelTrainer()
+            preload_thread = None
+            
+            # Each dataset starts from the same initial weights; restoring a snapshot is
+            # much cheaper than rebuilding the model
+            init_snapshot = trainer.snapshot_weights()
+            
+            for i, dataset in enumerate(datasets):
+                trainer.reset_weights(init_snapshot)
+                if preload_thread is not None:
+                    preload_thread.join()
+                if i + 1 < len(datasets):
+                    preload_thread = threading.Thread(target=trainer.preload, args=(datasets[i + 1],), daemon=True)
+                    preload_thread.start()
+                
+                metrics = trainer.train(dataset)
+                results[dataset] = metrics
+                record_progress(dataset, metrics)
+    
+    # Workers finish in any order; keep the results file in the same order as the datasets list
+    results = {dataset: results[dataset] for dataset in datasets}
+    save_results(results, final=True)
     
     logger.info("Training completed!")
-    logger.info(f"Final results: {json.dumps(results, indent=2)}")
+    # The results are already serialized by save_results, so only point to the file
+    logger.info("Final results written to %s", MODELS_DIR / LATEST_RESULTS_FILE)
 
-def save_results(results: dict):
-    """Save training results to a JSON file"""
-    output_dir = Path(__file__).parent.parent / 'models'
-    output_dir.mkdir(parents=True, exist_ok=True)
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_file = output_dir / f'training_results_{timestamp}.json'
+def save_results(results: dict, final: bool = False, fsync: bool = False):
+    """
+    Save training results to LATEST_RESULTS_FILE
+    The final save also keeps a timestamped copy; fsync makes the write durable
+    """
+    # Serialize once in memory, then write it in one go
+    data = orjson.dumps(results, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
     
-    with open(output_file, 'w') as f:
-        json.dump(results, f, indent=2)
+    _atomic_write(MODELS_DIR / LATEST_RESULTS_FILE, data, fsync)
+    if final:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        _atomic_write(MODELS_DIR / f'training_results_{timestamp}.json', data, fsync)
+
+def _atomic_write(output_file: Path, data: bytes, fsync: bool = False):
+    """Write to a temporary file and rename it over the target, so readers never see a partial file"""
+    tmp_file = output_file.with_suffix('.tmp')
+    if fsync:
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+    else:
+        # Let the OS batch the write back to disk
+        tmp_file.write_bytes(data)
+    os.replace(tmp_file, output_file)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
\ No newline at end of file